@@ -0,0 +1,29 @@
+# Times build_segments against build_segments_parallel and checks they match.
+# usage: python tests/benchmark_segments.py [rows]
+import os
+import sys
+import time
+
+import voucher_notification_tool as vnt
+from test_parallel_segments import make_orders
+
+
+def benchmark_segments(rows: int) -> None:
+    df = make_orders(rows)
+
+    timings = {}
+    for name, build in [("serial", vnt.build_segments), ("parallel", vnt.build_segments_parallel)]:
+        emitted_rows = []
+        started = time.perf_counter()
+        segments = build(df.copy(), "1 January", "2 January", emitted_rows)
+        timings[name] = (time.perf_counter() - started, segments, emitted_rows)
+
+    identical = timings["serial"][1:] == timings["parallel"][1:]
+    speedup = timings["serial"][0] / timings["parallel"][0]
+    print(f"build_segments ({rows} rows, {os.cpu_count()} CPUs): serial {timings['serial'][0]:.2f}s, parallel {timings['parallel'][0]:.2f}s, {speedup:.2f}x, identical output: {identical}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    benchmark_segments(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
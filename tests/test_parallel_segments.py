@@ -0,0 +1,36 @@
+import random
+
+import pandas as pd
+
+import voucher_notification_tool as vnt
+
+
+def make_orders(rows: int) -> pd.DataFrame:
+    # Shuffled orders over a few voucher amounts, sorted like generate_file does
+    order_ids = list(range(rows))
+    random.Random(0).shuffle(order_ids)
+    return pd.DataFrame({
+        "Order No": [f"ORD{i}" for i in order_ids],
+        "Contact": [f"017{i:08d}" for i in range(rows)],
+        "Voucher": [50 * (i % 5 + 1) for i in order_ids],
+    }).sort_values(by="Voucher")
+
+
+def build_both(df: pd.DataFrame):
+    serial_rows, parallel_rows = [], []
+    serial = vnt.build_segments(df.copy(), "1 January", "2 January", serial_rows)
+    # A tiny chunk size splits every amount into many chunks across the workers
+    parallel = vnt.build_segments_parallel(df.copy(), "1 January", "2 January", parallel_rows, workers=2, chunk_size=37)
+    return (serial, serial_rows), (parallel, parallel_rows)
+
+
+def test_parallel_matches_serial():
+    serial, parallel = build_both(make_orders(2_000))
+    assert parallel == serial
+
+
+def test_parallel_matches_serial_with_newline_in_value():
+    df = make_orders(200)
+    df.iloc[5, df.columns.get_loc("Order No")] = "ORD\nSPLIT"
+    serial, parallel = build_both(df)
+    assert parallel == serial
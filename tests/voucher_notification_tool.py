@@ -0,0 +1,12 @@
+# Importable alias of "voucher notification tool (v1.5).py" (its file name has spaces).
+# Process pool workers unpickle functions by module name, so the script must be importable by name.
+import importlib.util
+import sys
+from pathlib import Path
+
+_spec = importlib.util.spec_from_file_location(
+    __name__, Path(__file__).resolve().parents[1] / "voucher notification tool (v1.5).py"
+)
+_module = importlib.util.module_from_spec(_spec)
+sys.modules[__name__] = _module
+_spec.loader.exec_module(_module)
@@ -1,16 +1,46 @@
 # pyinstaller --onefile --windowed --distpath . --exclude-module scipy --exclude-module unittest "F:\__Practice\Python\voucher_notification_tool\voucher notification tool (v1.5).py"
 # pyinstaller --windowed --distpath . --exclude-module scipy --exclude-module unittest --add-data "logo.ico;." --icon "logo.ico" "F:\__Practice\Python\voucher_notification_tool\voucher notification tool (v1.5).py"
+# Console build for the voucher history queries (the --windowed builds have no stdout):
+# pyinstaller --onefile --console --name "voucher history" --distpath . --exclude-module scipy --exclude-module unittest "F:\__Practice\Python\voucher_notification_tool\voucher notification tool (v1.5).py"
+# usage: "voucher history.exe" history contacts|vouchers|daily [--contact 017XXXXXXXX] [--from dd/mm/yyyy] [--to dd/mm/yyyy]
 
 import os
 import re
 import sys
+import math
+import time
+import uuid
+import numbers
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from io import StringIO
 from datetime import datetime
 import pandas as pd
-from tabulate import tabulate
 from tkcalendar import Calendar
 import customtkinter as ctk
 
+try:
+    # Optional: needed only for the voucher history store
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+try:
+    # Optional: display width of wide (e.g. Bangla, full-width) text in the preview tables, as tabulate uses it
+    import wcwidth
+except ImportError:
+    wcwidth = None
+
+# Inputs with at least this many rows are rendered on a process pool, on machines with enough cores.
+# Measured per 1M rows: 2.2s of rendering, 0.4s to ship it to the workers and back, plus ~1s to
+# spawn workers that re-import this module, so the pool only pays off around 1M rows on 4+ cores.
+# Run tests/benchmark_segments.py to re-check the crossover on a given machine.
+parallel_min_rows = 1_000_000
+parallel_min_cpus = 4
+parallel_chunk_size = 50_000
+
+
 def resource_path(relative_path):
     try:
         # Creates a temporary folder and stores path in _MEIPASS
@@ -28,60 +58,504 @@ def format_date(date_input: str) -> str:
         return None
 
 
-def build_segments(df: pd.DataFrame, start: str, end: str) -> list[str]:
+def normalize_contact(contact) -> str:
+    # Add the missing leading "0" to 10 digit contacts
+    return str(contact) if len(str(contact)) != 10 else "0" + str(contact)
+
+
+def format_order_contact(line: str) -> str:
+    match = re.match(r"(\w+)\s*(\d+)", line)
+    if match:
+        order, contact = match.groups()
+        return f"{order}\u00A0\u00A0\u00A0{contact}"
+    return line
+
+
+def get_day_with_suffix(d):
+    day_num = int(d)
+    if 11 <= day_num <= 13:
+        return f"{d}th"
+    elif day_num % 10 == 1:
+        return f"{d}st"
+    elif day_num % 10 == 2:
+        return f"{d}nd"
+    elif day_num % 10 == 3:
+        return f"{d}rd"
+    else:
+        return f"{d}th"
+
+
+def format_validity(start: str, end: str) -> tuple[str, str]:
+    start_day, start_month = start.split()
+    end_day, end_month = end.split()
+    return f"{get_day_with_suffix(start_day)} {start_month}", f"{get_day_with_suffix(end_day)} {end_month}"
+
+
+def build_order_contact_lines(orders: list, contacts: list) -> list[str]:
+    return [format_order_contact(f"{order} {contact}") for order, contact in zip(orders, contacts)]
+
+
+def build_order_contact_block(orders: str, contacts: str) -> str:
+    # Worker side of build_segments_parallel: newline-joined values in, newline-joined lines out
+    return "\n".join(build_order_contact_lines(orders.split("\n"), contacts.split("\n")))
+
+
+def build_segment(serial: int, amount, order_contact_lines: list[str], start_date_str: str, end_date_str: str) -> str:
+    code_str = f"SORRY{int(amount)}"
+    mov = int(amount) + 49
+    lines = [
+        f"{serial}. {code_str}",
+        *order_contact_lines,
+        f"Use coupon {code_str} to get {int(amount)} taka off",
+        f"Minimum order: {mov} taka",
+        f"Validity: {start_date_str} to {end_date_str}",
+        "Not applicable for Flat discount-providing restaurants",
+    ]
+    return "\n".join(lines)
+
+
+def build_segments(df: pd.DataFrame, start: str, end: str, emitted_rows: list = None) -> list[str]:
     segments = []
 
     # Change Voucher column to numeric to maintain numeric order in the final text
     df["Voucher"] = pd.to_numeric(df["Voucher"], errors="coerce")
-    
-    def format_order_contact(line: str) -> str:
-        match = re.match(r"(\w+)\s*(\d+)", line)
-        if match:
-            order, contact = match.groups()
-            return f"{order}\u00A0\u00A0\u00A0{contact}"
-        return line
 
-    start_day, start_month = start.split()
-    end_day, end_month = end.split()
+    start_date_str, end_date_str = format_validity(start, end)
+
+    for serial, (amount, group) in enumerate(df.groupby("Voucher"), start=1):
+        order_contact_lines = build_order_contact_lines(group["Order No"].tolist(), group["Contact"].tolist())
+        segments.append(build_segment(serial, amount, order_contact_lines, start_date_str, end_date_str))
+        if emitted_rows is not None:
+            emitted_rows.extend(group.index)
+    return segments
+
+
+def build_segments_parallel(df: pd.DataFrame, start: str, end: str, emitted_rows: list = None, workers: int = None, chunk_size: int = parallel_chunk_size) -> list[str]:
+    segments = []
+
+    # Same numeric conversion and grouping as build_segments, so serials and row order match it exactly
+    df["Voucher"] = pd.to_numeric(df["Voucher"], errors="coerce")
+
+    start_date_str, end_date_str = format_validity(start, end)
+    groups = list(df.groupby("Voucher"))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # One shard per voucher amount, large amounts are split into chunks of rows.
+        # Chunks travel as single joined strings, which pickle far faster than lists of strings.
+        shards = []
+        for _, group in groups:
+            orders = [str(order) for order in group["Order No"].tolist()]
+            contacts = [str(contact) for contact in group["Contact"].tolist()]
+            if emitted_rows is not None:
+                emitted_rows.extend(group.index)
+
+            chunks = []
+            for i in range(0, len(orders), chunk_size):
+                separators = len(orders[i:i + chunk_size]) - 1
+                order_block = "\n".join(orders[i:i + chunk_size])
+                contact_block = "\n".join(contacts[i:i + chunk_size])
+                if order_block.count("\n") == separators and contact_block.count("\n") == separators:
+                    chunks.append(pool.submit(build_order_contact_block, order_block, contact_block))
+                else:
+                    # A value contains a newline and can't be split back apart, render this chunk here
+                    chunks.append("\n".join(build_order_contact_lines(orders[i:i + chunk_size], contacts[i:i + chunk_size])))
+            shards.append(chunks)
+
+        # Reassemble in group order, chunks in row order (each chunk is already newline-joined lines)
+        for serial, ((amount, _), chunks) in enumerate(zip(groups, shards), start=1):
+            order_contact_lines = [chunk if isinstance(chunk, str) else chunk.result() for chunk in chunks]
+            segments.append(build_segment(serial, amount, order_contact_lines, start_date_str, end_date_str))
+    return segments
+
+
+def parse_campaign_windows(text: str) -> list[tuple[str, str, str, list[pd.Timestamp]]]:
+    # One window per line: Session, validity start, validity end, sheet Date(s) (dd/mm/yyyy, comma separated)
+    windows = []
+    seen = {}
+    date_lines = {}
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+
+        parts = line.split()
+        if len(parts) != 4 or parts[0].capitalize() not in ("Morning", "Evening"):
+            raise ValueError(f"Line {number}: expected 'Session Start End Sheet-Dates'.")
+
+        session, start, end, sheet_dates = parts
+        start_date, end_date = format_date(start), format_date(end)
+        if not start_date or not end_date:
+            raise ValueError(f"Line {number}: validity dates must be dd/mm/yyyy.")
+        try:
+            dates = [pd.Timestamp(datetime.strptime(d, "%d/%m/%Y")) for d in sheet_dates.split(",")]
+        except ValueError:
+            raise ValueError(f"Line {number}: sheet dates must be dd/mm/yyyy.")
+
+        # Each window writes {session}_{start}_to_{end}.txt, so the same window twice would overwrite itself
+        window = (session.capitalize(), start_date.lstrip("0"), end_date.lstrip("0"))
+        if window in seen:
+            raise ValueError(f"Line {number}: same session and validity as line {seen[window]}, list all its sheet dates on one line.")
+        seen[window] = number
+
+        # A sheet date can feed only one window, otherwise the later window silently gets none of its rows
+        for day in dates:
+            if date_lines.get(day) == number:
+                raise ValueError(f"Line {number}: sheet date {day:%d/%m/%Y} is listed twice.")
+            if day in date_lines:
+                raise ValueError(f"Line {number}: sheet date {day:%d/%m/%Y} is already used by line {date_lines[day]}.")
+            date_lines[day] = number
+
+        windows.append((*window, dates))
+
+    if not windows:
+        raise ValueError("Add at least one window.")
+    return windows
+
+
+def parse_sheet_dates(dates: pd.Series) -> pd.Series:
+    # dd/mm/yyyy like the windows, then ISO yyyy-mm-dd; NaT when the Date is neither
+    text = dates.astype(str).str.strip()
+    days = pd.to_datetime(text, format="%d/%m/%Y", errors="coerce")
+    return days.fillna(pd.to_datetime(text, format="%Y-%m-%d", errors="coerce"))
+
+
+def assign_windows(days: pd.Series, windows: list[tuple[str, str, str, list[pd.Timestamp]]]) -> pd.Series:
+    # Position of the first window listing the row's sheet Date, -1 when no window does
+    day_to_window = {}
+    for position, (_, _, _, sheet_dates) in enumerate(windows):
+        for day in sheet_dates:
+            day_to_window.setdefault(day, position)
+
+    return days.map(day_to_window).fillna(-1).astype(int)
+
+
+def build_campaign_segments(df: pd.DataFrame, windows: list[tuple[str, str, str, list[pd.Timestamp]]], emitted_rows: list = None) -> list[list[str]]:
+    segments = [[] for _ in windows]
+    serials = [0] * len(windows)
+
+    # Change Voucher column to numeric to maintain numeric order in the final text
+    df["Voucher"] = pd.to_numeric(df["Voucher"], errors="coerce")
+
+    validity = [format_validity(start, end) for _, start, end, _ in windows]
+
+    # One pass over (window, amount) groups, numbered per window like build_segments
+    for (window, amount), group in df[df["Window"] >= 0].groupby(["Window", "Voucher"]):
+        serials[window] += 1
+        order_contact_lines = build_order_contact_lines(group["Order No"].tolist(), group["Contact"].tolist())
+        segments[window].append(build_segment(serials[window], amount, order_contact_lines, *validity[window]))
+        if emitted_rows is not None:
+            emitted_rows.extend(group.index)
+    return segments
+
+
+def build_voucher_given_block(voucher_given: pd.Series, emitted_rows: list) -> str:
+    # The sheet's "Voucher Given" column in original row order, set to "yes" for every emitted row
+    values = voucher_given.tolist()
+    for position in voucher_given.index.get_indexer(emitted_rows):
+        values[position] = "yes"
+    return "\n".join(["Voucher Given", *values])
+
+
+def notification_file_name(session: str, start: str, end: str) -> str:
+    return f"{session}_{start.replace(' ', '_')}_to_{end.replace(' ', '_')}.txt"
+
+
+def fingerprint_path(file_name: str) -> str:
+    # One fingerprint file per session and validity window, named after the notification file
+    return os.path.join(data_folder, "fingerprints", f"{os.path.splitext(file_name)[0]}.tsv")
+
+
+def load_fingerprints(path: str) -> set[tuple[str, str, int]]:
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, encoding="utf-8") as f:
+        rows = (line.rstrip("\n").split("\t") for line in f if line.strip())
+        return {(order, contact, int(voucher)) for order, contact, voucher in rows}
+
+
+def save_fingerprints(path: str, fingerprints: set[tuple[str, str, int]]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(f"{order}\t{contact}\t{voucher}\n" for order, contact, voucher in sorted(fingerprints))
+
+
+def row_fingerprints(df: pd.DataFrame) -> list[tuple[str, str, int]]:
+    # (Order No, Contact, Voucher) triple of every row, in row order
+    return list(zip(df["Order No"].astype(str), df["Contact"].astype(str), df["Voucher"].astype(int)))
 
-    def get_day_with_suffix(d):
-        day_num = int(d)
-        if 11 <= day_num <= 13:
-            return f"{d}th"
-        elif day_num % 10 == 1:
-            return f"{d}st"
-        elif day_num % 10 == 2:
-            return f"{d}nd"
-        elif day_num % 10 == 3:
-            return f"{d}rd"
+
+def split_delta(df: pd.DataFrame, sent: set[tuple[str, str, int]], still_given: set[tuple[str, str, int]] = frozenset()) -> tuple[pd.DataFrame, list[tuple[str, str, int]], set[tuple[str, str, int]]]:
+    keys = row_fingerprints(df)
+    current = set(keys)
+
+    new_df = df[[key not in sent for key in keys]].copy()
+    # Rows marked "yes" in the sheet were filtered out of df but are still present, not removed
+    removed = sorted(sent - current - still_given, key=lambda key: (key[2], key[0], key[1]))
+    return new_df, removed, current | (sent & still_given)
+
+
+def build_removed_report(removed: list[tuple[str, str, int]]) -> str:
+    lines = ["Removed since the previous file (notification no longer needed):"]
+    lines += [
+        f"{format_order_contact(f'{order} {contact}')}\u00A0\u00A0\u00A0SORRY{voucher}"
+        for order, contact, voucher in removed
+    ]
+    return "\n".join(lines)
+
+
+# Box characters (begin, fill, separator, end) for the lines of each table style
+table_styles = {
+    "fancy_grid": {"above": "╒═╤╕", "below_header": "╞═╪╡", "between_rows": "├─┼┤", "below": "╘═╧╛"},
+    "rounded_outline": {"above": "╭─┬╮", "below_header": "├─┼┤", "between_rows": None, "below": "╰─┴╯"},
+}
+
+thousands_number = re.compile(r"^(([+-]?[0-9]{1,3})(?:,([0-9]{3}))*)?(?(1)\.[0-9]*|\.[0-9]+)?$")
+
+
+def cell_kind(value) -> int:
+    # 0 empty, 1 bool, 2 int, 3 float, 4 text (the column type is the highest kind, as in tabulate)
+    if value is None or (isinstance(value, str) and not value):
+        return 0
+    if isinstance(value, str):
+        if value in ("True", "False"):
+            return 1
+        try:
+            int(value)
+            return 2
+        except ValueError:
+            pass
+        if thousands_number.match(value):
+            return 3 if "." in value else 2
+        try:
+            number = float(value)
+        except ValueError:
+            return 4
+        return 3 if not (math.isinf(number) or math.isnan(number)) or value.lower() in ("inf", "-inf", "nan") else 4
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, numbers.Integral):
+        return 2
+    if isinstance(value, numbers.Real):
+        return 3
+    return 4
+
+
+def format_cell(value, kind: int) -> str:
+    if value is None or (isinstance(value, str) and not value):
+        return ""
+    if kind == 2:
+        return value if isinstance(value, str) else format(value, "")
+    if kind == 3:
+        try:
+            return format(float(value.replace(",", "") if isinstance(value, str) else value), "g")
+        except (ValueError, TypeError):
+            return f"{value}"
+    return f"{value}"
+
+
+def digits_after_point(cell: str) -> int:
+    # Decimal alignment offset: -1 for integers and text
+    if cell_kind(cell) != 3:
+        return -1
+    pos = cell.rfind(".")
+    pos = cell.lower().rfind("e") if pos < 0 else pos
+    return len(cell) - pos - 1 if pos >= 0 else -1
+
+
+def text_width(text: str) -> int:
+    # Printable ASCII is one column per character, anything else is measured by wcwidth when installed
+    if wcwidth is None or (text.isascii() and text.isprintable()):
+        return len(text)
+    return wcwidth.wcswidth(text)
+
+
+def render_table(data, headers: list[str] = None, style: str = "fancy_grid") -> str:
+    # Drop-in for tabulate(data, headers, tablefmt=style, showindex=False) on single-line cells,
+    # measuring wide characters with wcwidth exactly when tabulate does (i.e. when it is installed)
+    if isinstance(data, pd.DataFrame):
+        headers = [str(c) for c in data.columns] if headers == "keys" else headers
+        columns = [data.iloc[:, i].tolist() for i in range(data.shape[1])]
+    else:
+        columns = [list(c) for c in zip(*data)]
+    headers = list(headers or [])
+    if not columns:
+        columns = [[] for _ in headers]
+
+    aligned_columns = []
+    widths = []
+    numeric = []
+    for i, values in enumerate(columns):
+        kind = max(map(cell_kind, values), default=1)
+        cells = [format_cell(v, kind) for v in values]
+        min_width = text_width(headers[i]) + 2 if headers else 0
+
+        if kind in (2, 3):
+            # Numbers: align on the decimal point (flushed right below)
+            if kind == 3:
+                points = [digits_after_point(c) for c in cells]
+                most = max(points, default=-1)
+                cells = [c + " " * (most - p) for c, p in zip(cells, points)]
+        else:
+            cells = [c.strip() for c in cells]
+
+        # Pad by display width: wide characters take two columns but count as one in len()
+        cell_widths = list(map(text_width, cells))
+        width = max(max(cell_widths, default=0), min_width)
+        if kind in (2, 3):
+            cells = [c.rjust(width + len(c) - w) for c, w in zip(cells, cell_widths)]
         else:
-            return f"{d}th"
+            cells = [c.ljust(width + len(c) - w) for c, w in zip(cells, cell_widths)]
 
-    start_date_str = f"{get_day_with_suffix(start_day)} {start_month}"
-    end_date_str = f"{get_day_with_suffix(end_day)} {end_month}"
+        aligned_columns.append(cells)
+        widths.append(width)
+        numeric.append(kind in (2, 3))
 
-    for serial, (amount, group) in enumerate(df.groupby("Voucher"), start=1):
-        code_str = f"SORRY{int(amount)}"
-        mov = int(amount) + 49
-        order_contact_lines = [
-            format_order_contact(f"{row['Order No']} {row['Contact']}")
-            for _, row in group.iterrows()
-        ]
-        lines = [
-            f"{serial}. {code_str}",
-            *order_contact_lines,
-            f"Use coupon {code_str} to get {int(amount)} taka off",
-            f"Minimum order: {mov} taka",
-            f"Validity: {start_date_str} to {end_date_str}",
-            "Not applicable for Flat discount-providing restaurants",
+    def line(chars):
+        begin, fill, sep, end = chars
+        return begin + sep.join(fill * (w + 2) for w in widths) + end
+
+    box = table_styles[style]
+    row_lines = ["│ " + " │ ".join(cells) + " │" for cells in zip(*aligned_columns)]
+
+    lines = [line(box["above"])]
+    if headers:
+        header_cells = [
+            h.rjust(w + len(h) - text_width(h)) if n else h.ljust(w + len(h) - text_width(h))
+            for h, w, n in zip(headers, widths, numeric)
         ]
-        segments.append("\n".join(lines))
-    return segments
+        lines += ["│ " + " │ ".join(header_cells) + " │", line(box["below_header"])]
+    if box["between_rows"] and row_lines:
+        lines.append(f"\n{line(box['between_rows'])}\n".join(row_lines))
+    else:
+        lines += row_lines
+    lines.append(line(box["below"]))
+    return "\n".join(lines)
+
+
+def append_history(df: pd.DataFrame, session: str, start: str, end: str, generated_at: datetime) -> str | None:
+    if pyarrow is None or df.empty:
+        return None
+
+    amounts = df["Voucher"].astype(int)
+    history = pd.DataFrame({
+        "order_no": df["Order No"].astype(str),
+        "contact": df["Contact"].astype(str),
+        "amount": amounts,
+        "code": "SORRY" + amounts.astype(str),
+        "valid_from": start,
+        "valid_to": end,
+        "session": session,
+        "generated_at": pd.Timestamp(generated_at),
+    })
+
+    # One file per call inside its day partition (e.g. history/day=2026-10-19/), unique even for equal timestamps
+    partition = os.path.join(history_folder, f"day={generated_at:%Y-%m-%d}")
+    os.makedirs(partition, exist_ok=True)
+    output_path = os.path.join(partition, f"{generated_at:%H%M%S%f}_{uuid.uuid4().hex}.parquet")
+    history.to_parquet(output_path, index=False)
+    return output_path
+
+
+def read_history(columns: list[str], since: str = None, until: str = None, contact: str = None) -> pd.DataFrame:
+    if pyarrow is None:
+        raise RuntimeError("pyarrow is required to read the voucher history.")
+    if not os.path.isdir(history_folder):
+        return pd.DataFrame(columns=columns)
+
+    # Day filters prune whole partitions, the contact filter is pushed down to the row groups
+    filters = []
+    if since:
+        filters.append(("day", ">=", since))
+    if until:
+        filters.append(("day", "<=", until))
+    if contact:
+        filters.append(("contact", "==", normalize_contact(contact)))
+
+    df = pd.read_parquet(history_folder, columns=columns, filters=filters or None)
+    if "day" in df.columns:
+        df["day"] = df["day"].astype(str)
+    return df
+
+
+def contact_totals(since: str = None, until: str = None, contact: str = None) -> pd.DataFrame:
+    df = read_history(["contact", "amount"], since, until, contact)
+    return (
+        df.groupby("contact")["amount"].agg(Vouchers="count", Total="sum")
+        .sort_values(by="Total", ascending=False)
+        .reset_index()
+        .rename(columns={"contact": "Contact"})
+    )
+
+
+def voucher_distribution(since: str = None, until: str = None, contact: str = None) -> pd.DataFrame:
+    df = read_history(["amount"], since, until, contact)
+    return (
+        df.groupby("amount")["amount"].agg(Count="count", Total="sum")
+        .reset_index()
+        .rename(columns={"amount": "Voucher"})
+    )
+
+
+def daily_spend(since: str = None, until: str = None, contact: str = None) -> pd.DataFrame:
+    df = read_history(["day", "amount"], since, until, contact)
+    return (
+        df.groupby("day")["amount"].agg(Vouchers="count", Total="sum")
+        .reset_index()
+        .rename(columns={"day": "Day"})
+    )
+
+
+def history_main(argv: list[str]) -> None:
+    queries = {"contacts": contact_totals, "vouchers": voucher_distribution, "daily": daily_spend}
+
+    parser = argparse.ArgumentParser(prog="history", description="Query the voucher history of generated files.")
+    parser.add_argument("query", choices=queries, help="contacts: per-contact totals, vouchers: per-amount distribution, daily: daily spend")
+    parser.add_argument("--contact", help="only this contact")
+    parser.add_argument("--from", dest="since", type=lambda d: datetime.strptime(d, "%d/%m/%Y").strftime("%Y-%m-%d"), help="first day (dd/mm/yyyy)")
+    parser.add_argument("--to", dest="until", type=lambda d: datetime.strptime(d, "%d/%m/%Y").strftime("%Y-%m-%d"), help="last day (dd/mm/yyyy)")
+    args = parser.parse_args(argv)
+
+    result = queries[args.query](args.since, args.until, args.contact)
+    if result.empty:
+        print("No voucher history found.")
+        return
+    print(render_table(result, headers="keys", style="rounded_outline"))
+
+
+def benchmark_tables(rows: int = 20_000, repeat: int = 3) -> None:
+    from tabulate import tabulate
+
+    # Shaped like the invalid rows preview: string columns with numeric-looking values and blanks
+    invalid_df = pd.DataFrame({
+        "Order No": [f"ORD{i}" if i % 7 else "" for i in range(rows)],
+        "Contact": [f"017{i:08d}" for i in range(rows)],
+        "Voucher": [str(50 * (i % 5 + 1)) if i % 11 else "" for i in range(rows)],
+        "Reason": ["Duplicate Contact" if i % 3 else "Voucher Missing" for i in range(rows)],
+    })
+
+    for style in ("fancy_grid", "rounded_outline"):
+        timings = {}
+        for name, render in [
+            ("tabulate", lambda: tabulate(invalid_df, headers="keys", tablefmt=style, showindex=False)),
+            ("render_table", lambda: render_table(invalid_df, headers="keys", style=style)),
+        ]:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                output = render()
+            timings[name] = ((time.perf_counter() - started) / repeat, output)
+
+        identical = timings["tabulate"][1] == timings["render_table"][1]
+        speedup = timings["tabulate"][0] / timings["render_table"][0]
+        print(f"{style} ({rows} rows): tabulate {timings['tabulate'][0]:.3f}s, render_table {timings['render_table'][0]:.3f}s, {speedup:.1f}x faster, identical output: {identical}")
 
 
 # Set customer colors (Global)
 error_color = "#EE4B2B"
 
+# Folder for data kept between runs (e.g. fingerprints of already emitted rows)
+data_folder = os.path.join(os.path.expanduser("~"), ".voucher_notification_tool")
+history_folder = os.path.join(data_folder, "history")
+
 class App(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -119,6 +593,9 @@ class App(ctk.CTk):
         self.start_date = None
         self.end_date = None
         self.processed_df = None 
+        self.source_dates = None
+        self.given_fingerprints = set()
+        self.source_voucher_given = None
 
         # # Title widget
         # self.title_label = ctk.CTkLabel(self, text="Welcome! ", font=ctk.CTkFont(family=self.FONT_FAMILY, size=self.TITLE_FONT_SIZE, weight="bold"))
@@ -190,8 +667,15 @@ class App(ctk.CTk):
         self.preview_textbox = ctk.CTkTextbox(self.preview_tab, font=(self.MONOSPACE_FAMILY, self.TEXTBOX_FONT_SIZE), state="disabled")
         self.preview_textbox.grid(row=0, column=0, padx=0, pady=10, sticky="nsew")
 
+        self.delta_var = ctk.BooleanVar(value=False)
+        self.delta_switch = ctk.CTkSwitch(self.preview_tab, text="Only new entries (since the previous file)", variable=self.delta_var, font=ctk.CTkFont(family=self.FONT_FAMILY, size=self.STATUS_FONT_SIZE))
+        self.delta_switch.grid(row=1, column=0, padx=0, pady=(5, 0), sticky="w")
+
         self.generate_button = ctk.CTkButton(self.preview_tab, text="Generate Notification File", font=ctk.CTkFont(family=self.FONT_FAMILY, size=self.HEADER_FONT_SIZE, weight="bold"), height=40, hover_color="#21547A",fg_color="#26618F", command=self.generate_file)
-        self.generate_button.grid(row=1, column=0, padx=0, pady=(10, 18), sticky="ew")
+        self.generate_button.grid(row=2, column=0, padx=0, pady=(10, 0), sticky="ew")
+
+        self.campaign_button = ctk.CTkButton(self.preview_tab, text="Plan Campaign (multiple windows)", font=ctk.CTkFont(family=self.FONT_FAMILY, size=self.BUTTON_FONT_SIZE), height=32, hover_color="#21547A",fg_color="#26618F", command=self.open_campaign_planner)
+        self.campaign_button.grid(row=3, column=0, padx=0, pady=(10, 18), sticky="ew")
         
         # Status Bar
         self.status_label = ctk.CTkLabel(self, text="Step 1: Please select validity dates and paste data (with headers).", text_color="gray60", font=ctk.CTkFont(family=self.FONT_FAMILY, size=self.STATUS_FONT_SIZE))
@@ -244,11 +728,17 @@ class App(ctk.CTk):
         self.preview_textbox.configure(state="disabled")
         
         self.processed_df = None
+        self.source_dates = None
+        self.source_voucher_given = None
+        self.given_fingerprints = set()
         self.update_status("Inputs cleared. Ready to paste new data.", "gray60")
         self.tab_view.set("Step 1: Input Data")
 
     def show_preview(self):
         self.processed_df = None
+        self.source_dates = None
+        self.source_voucher_given = None
+        self.given_fingerprints = set()
 
         if not self.start_date or not self.end_date:
             self.update_status("(ERROR) Please select both a start and end date.", error_color)
@@ -269,14 +759,40 @@ class App(ctk.CTk):
             dtype_mapping = {
                 "Order No": str, 
                 "Contact": str,
-                "Voucher": str
+                "Voucher": str,
+                "Voucher Given": str
             }
-            df = pd.read_csv(StringIO(raw_data), sep="\t", dtype=dtype_mapping)
+            # Keep blank lines so row positions match the source sheet
+            df = pd.read_csv(StringIO(raw_data), sep="\t", dtype=dtype_mapping, skip_blank_lines=False)
+
+            # Current "Voucher Given" cells of every pasted row, read verbatim (no "N/A"/"NULL" to NaN
+            # conversion) so the write-back block only changes the rows it marks "yes"
+            if "Voucher Given" in df.columns:
+                self.source_voucher_given = pd.read_csv(
+                    StringIO(raw_data), sep="\t", usecols=["Voucher Given"], dtype=str, keep_default_na=False, skip_blank_lines=False
+                )["Voucher Given"]
+            else:
+                self.source_voucher_given = pd.Series("", index=df.index)
+
+            # Fingerprints of rows already marked "yes", so delta mode doesn't report them as removed
+            if {"Voucher Given", "Order No", "Contact", "Voucher"} <= set(df.columns):
+                given_df = df[df["Voucher Given"].astype(str).str.strip().str.lower() == "yes"].dropna(subset=["Order No", "Contact"])
+                given_vouchers = pd.to_numeric(given_df["Voucher"], errors="coerce")
+                given_df = given_df[given_vouchers.notna()]
+                self.given_fingerprints = set(zip(
+                    given_df["Order No"].astype(str),
+                    given_df["Contact"].apply(normalize_contact),
+                    given_vouchers.dropna().astype(int),
+                ))
 
             # Remove withdrawn or already given vouchers
             if "Voucher Given" in df.columns:
                 df = df[~df["Voucher Given"].astype(str).str.strip().str.lower().isin(["yes", "withdrawn"])]
 
+            # Keep the sheet dates aside (by row index) for the campaign planner
+            if "Date" in df.columns:
+                self.source_dates = df["Date"]
+
             # Prepare and clean columns
             expected_cols = ["Order No", "Contact", "Voucher"]
             df = df[[c for c in expected_cols if c in df.columns]]
@@ -339,11 +855,7 @@ class App(ctk.CTk):
                 ["Missing Contacts", missing_contact_count],
                 ["Duplicate Contacts", duplicate_count],
             ]
-            summary_table = tabulate(
-                summary_data,
-                tablefmt="fancy_grid",
-                showindex=False,
-            )
+            summary_table = render_table(summary_data, style="fancy_grid")
             summary_parts.append(f"# Data Summary:\n{summary_table}\n" + "┈➤ ATTENTION: Entries with duplicate contacts are ALLOWED by default.\n\n")
 
 
@@ -353,28 +865,18 @@ class App(ctk.CTk):
                 invalid_df["Voucher"] = invalid_df["Voucher"].fillna("").astype(str)
                 invalid_df["Order No"] = invalid_df["Order No"].fillna("").astype(str)
 
-                invalid_table = tabulate(
-                    invalid_df, 
-                    headers="keys", 
-                    tablefmt="fancy_grid", 
-                    showindex=False,
-                )
+                invalid_table = render_table(invalid_df, headers="keys", style="fancy_grid")
                 summary_parts.append(f"⚠️ Invalid Data Preview:\n{invalid_table}\n\n")
 
             # Voucher Distribution
             if "Voucher" in valid_df.columns and not valid_df["Voucher"].isnull().all():
                 voucher_counts = valid_df["Voucher"].dropna().astype(int).value_counts().sort_index()
                 voucher_data = [[voucher, count] for voucher, count in voucher_counts.items()]
-                voucher_summary_table = tabulate(
-                    voucher_data,
-                    headers=["Voucher", "Count"],
-                    tablefmt="rounded_outline",
-                    showindex=False,
-                )
+                voucher_summary_table = render_table(voucher_data, headers=["Voucher", "Count"], style="rounded_outline")
                 summary_parts.append(f"# Voucher Distribution:\n{voucher_summary_table}\n\n")
 
             # Valid Data Preview
-            raw_data_table = tabulate(valid_df, headers="keys", tablefmt="rounded_outline", showindex=False)
+            raw_data_table = render_table(valid_df, headers="keys", style="rounded_outline")
             summary_parts.append(f"✅ Valid Data Preview:\n{raw_data_table}\n") 
             
             preview_content = "\n".join(summary_parts)
@@ -392,38 +894,84 @@ class App(ctk.CTk):
             self.update_status(f"Error parsing data: {e}", error_color)
 
 
-    def generate_file(self):
+    def validated_output_df(self):
         if self.processed_df is None or self.processed_df.empty:
             self.update_status("(ERROR) No valid data to process. Please go back to Step 1.", error_color)
-            return
+            return None
 
         df = self.processed_df.copy()
 
         if df["Voucher"].isnull().any():
             self.update_status("(ERROR) One or more rows have a missing/invalid 'Voucher' amount.", error_color)
-            return
+            return None
         if df["Order No"].isnull().any() or (df["Order No"] == "").any():
             self.update_status("(ERROR) One or more rows have a missing 'Order No'.", error_color)
-            return
+            return None
         if df.duplicated(subset=["Contact"]).any():
             self.update_status("! Warning: Duplicate contacts found. Processing anyway.", "orange")
-        
+        return df
+
+    def generate_file(self):
+        df = self.validated_output_df()
+        if df is None:
+            return
+
         try:
-            df["Contact"] = df["Contact"].apply(lambda x: str(x) if len(str(x)) != 10 else "0" + str(x))
+            df["Contact"] = df["Contact"].apply(normalize_contact)
             df["Voucher"] = df["Voucher"].astype(int)
             df = df.sort_values(by="Voucher")
-            
-            segments = build_segments(df, self.start_date, self.end_date)
-            
+
             output_folder = os.path.join(os.path.expanduser("~"), "Desktop")
             user_session = self.session_var.get()
-            file_name = f"{user_session}_{self.start_date.replace(' ', '_')}_to_{self.end_date.replace(' ', '_')}.txt"
-            output_path = os.path.join(output_folder, file_name)
+            file_name = notification_file_name(user_session, self.start_date, self.end_date)
+            fingerprint_file = fingerprint_path(file_name)
+            build = build_segments_parallel if len(df) >= parallel_min_rows and (os.cpu_count() or 1) >= parallel_min_cpus else build_segments
+            emitted_rows = []
+
+            # Rows not present in the previous file of this session and validity window
+            new_df, removed, current = split_delta(df, load_fingerprints(fingerprint_file), self.given_fingerprints)
+
+            if self.delta_var.get():
+                if new_df.empty and not removed:
+                    self.update_status("No new or removed entries since the previous file.", "orange")
+                    return
+
+                segments = build(new_df, self.start_date, self.end_date, emitted_rows) if not new_df.empty else []
+                # Rows from the previous file were given too
+                emitted_rows.extend(df.index.difference(new_df.index))
+                output_path = os.path.join(output_folder, file_name.replace(".txt", "_new.txt"))
+                content = f"Need to send notification for the new entries below:\n\n{'\n\n'.join(segments)}" if segments else "No new entries since the previous file."
+                if removed:
+                    content += f"\n\n\n{build_removed_report(removed)}"
+            else:
+                segments = build(df, self.start_date, self.end_date, emitted_rows)
+                output_path = os.path.join(output_folder, file_name)
+                content = f"Need to send notification for the coupon list below:\n\n{'\n\n'.join(segments)}"
 
             with open(output_path, "w", encoding="utf-8") as f:
-                f.write(f"Need to send notification for the coupon list below:\n\n{'\n\n'.join(segments)}")
-
-            self.update_status(f"✨ File generated ┈➤ 📁 {output_path}", "#35A800")
+                f.write(content)
+
+            save_fingerprints(fingerprint_file, current)
+
+            # Only rows not recorded by a previous file, so re-runs don't count them twice
+            history_error = None
+            try:
+                append_history(new_df, user_session, self.start_date, self.end_date, datetime.now())
+            except Exception as e:
+                history_error = e
+
+            # "Voucher Given" column ready to paste over the sheet's column (starting at its header cell)
+            write_back = build_voucher_given_block(self.source_voucher_given, emitted_rows)
+            with open(os.path.join(output_folder, file_name.replace(".txt", "_voucher_given.tsv")), "w", encoding="utf-8") as f:
+                f.write(write_back)
+            self.clipboard_clear()
+            self.clipboard_append(write_back)
+
+            message = f"✨ File generated ┈➤ 📁 {output_path} ('Voucher Given' column copied)"
+            if history_error:
+                self.update_status(f"{message} (! Voucher history not recorded: {history_error})", "orange")
+            else:
+                self.update_status(message, "#35A800")
             
             if os.name == 'nt':
                 os.startfile(output_path)
@@ -431,6 +979,120 @@ class App(ctk.CTk):
         except Exception as e:
             self.update_status(f"Error generating file: {e}", error_color)
 
+    def open_campaign_planner(self):
+        if self.processed_df is None or self.processed_df.empty:
+            self.update_status("(ERROR) No valid data to process. Please go back to Step 1.", error_color)
+            return
+        if self.source_dates is None:
+            self.update_status("(ERROR) The campaign planner needs a 'Date' column in the pasted data.", error_color)
+            return
+
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Plan Campaign")
+        dialog.geometry("560x360")
+        dialog.transient(self)
+        dialog.grab_set()
+
+        hint = "One window per line: Session  Start  End  Sheet Date(s)\ne.g. Morning  21/10/2026  23/10/2026  20/10/2026,19/10/2026"
+        ctk.CTkLabel(dialog, text=hint, justify="left", font=ctk.CTkFont(family=self.FONT_FAMILY, size=self.STATUS_FONT_SIZE)).pack(padx=15, pady=(15, 5), anchor="w")
+
+        windows_textbox = ctk.CTkTextbox(dialog, font=(self.MONOSPACE_FAMILY, self.TEXTBOX_FONT_SIZE))
+        windows_textbox.pack(padx=15, pady=5, fill="both", expand=True)
+
+        def on_generate():
+            if self.generate_campaign(windows_textbox.get("1.0", "end-1c")):
+                dialog.destroy()
+
+        generate_button = ctk.CTkButton(dialog, text="Generate All Files", command=on_generate, font=ctk.CTkFont(family=self.FONT_FAMILY, size=self.BUTTON_FONT_SIZE), hover_color="#21547A",fg_color="#26618F")
+        generate_button.pack(pady=10)
+
+    def generate_campaign(self, windows_text):
+        try:
+            windows = parse_campaign_windows(windows_text)
+        except ValueError as e:
+            self.update_status(f"(ERROR) {e}", error_color)
+            return False
+
+        df = self.validated_output_df()
+        if df is None:
+            return False
+
+        try:
+            df["Contact"] = df["Contact"].apply(normalize_contact)
+            df["Voucher"] = df["Voucher"].astype(int)
+            days = parse_sheet_dates(self.source_dates.loc[df.index])
+            df["Window"] = assign_windows(days, windows)
+            df = df.sort_values(by="Voucher")
+
+            # Parse and validate once, then render every window from the same grouped data
+            emitted_rows = []
+            all_segments = build_campaign_segments(df, windows, emitted_rows)
+
+            output_folder = os.path.join(os.path.expanduser("~"), "Desktop")
+            generated_at = datetime.now()
+            written = 0
+            empty_windows = []
+            history_error = None
+            for position, ((session, start, end, _), segments) in enumerate(zip(windows, all_segments)):
+                if not segments:
+                    empty_windows.append(f"{session} {start} to {end}")
+                    continue
+
+                file_name = notification_file_name(session, start, end)
+                with open(os.path.join(output_folder, file_name), "w", encoding="utf-8") as f:
+                    f.write(f"Need to send notification for the coupon list below:\n\n{'\n\n'.join(segments)}")
+                written += 1
+
+                # Record only rows not in this window's previous file, like generate_file
+                fingerprint_file = fingerprint_path(file_name)
+                new_df, _, current = split_delta(df[df["Window"] == position], load_fingerprints(fingerprint_file), self.given_fingerprints)
+                save_fingerprints(fingerprint_file, current)
+                try:
+                    append_history(new_df, session, start, end, generated_at)
+                except Exception as e:
+                    history_error = e
+
+            # One "Voucher Given" column for every window's rows, ready to paste over the sheet's column
+            write_back = build_voucher_given_block(self.source_voucher_given, emitted_rows)
+            with open(os.path.join(output_folder, f"Campaign_{generated_at:%d_%B_%H%M%S}_voucher_given.tsv"), "w", encoding="utf-8") as f:
+                f.write(write_back)
+            self.clipboard_clear()
+            self.clipboard_append(write_back)
+
+            invalid_dates = days.isna()
+            unassigned = int(((df["Window"] < 0) & ~invalid_dates).sum())
+            message = f"✨ {written} campaign file(s) generated ┈➤ 📁 {output_folder} ('Voucher Given' column copied)"
+
+            skipped = []
+            if invalid_dates.any():
+                orders = ", ".join(df.loc[invalid_dates, "Order No"].astype(str).head(3))
+                skipped.append(f"{int(invalid_dates.sum())} rows with an invalid Date, e.g. {orders}")
+            if unassigned:
+                skipped.append(f"{unassigned} rows matched no window")
+            if empty_windows:
+                skipped.append(f"no rows for {', '.join(empty_windows)}")
+            if history_error:
+                skipped.append(f"! Voucher history not recorded: {history_error}")
+
+            if skipped:
+                self.update_status(f"{message} ({'; '.join(skipped)})", "orange")
+            else:
+                self.update_status(message, "#35A800")
+            return True
+
+        except Exception as e:
+            self.update_status(f"Error generating campaign: {e}", error_color)
+            return False
+
 if __name__ == "__main__":
-    app = App()
-    app.mainloop()
\ No newline at end of file
+    # Required for the process pool in the PyInstaller build
+    multiprocessing.freeze_support()
+
+    # e.g. python "voucher notification tool (v1.5).py" history contacts --from 01/10/2026
+    if len(sys.argv) > 1 and sys.argv[1] == "history":
+        history_main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "benchmark-tables":
+        benchmark_tables()
+    else:
+        app = App()
+        app.mainloop()
\ No newline at end of file